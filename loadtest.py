@@ -0,0 +1,486 @@
+"""Offline load test for WebApp4G.
+
+Three commands, all standard library plus reportlab (already a dependency)
+and gunicorn:
+
+    python loadtest.py mock  --port 8765 --latency-ms 800
+        Local stand-in for the Gemini generateContent REST API with configurable
+        latency. Summary prompts get a valid summary JSON, everything else a
+        short answer.
+
+    python loadtest.py run   --url http://127.0.0.1:8000 --users 8 --duration 30
+        Drives a mix of /upload, /ask and /download_summary traffic. Every
+        virtual user keeps its own cookie jar, so requests stay bound to the
+        session the way a browser's would.
+
+    python loadtest.py sweep --worker-classes sync,gthread --workers 1,2,4
+        Starts the mock, then for each gunicorn configuration starts the app
+        against it, runs the load and reports throughput, p50/p95/p99 latency
+        per endpoint and per-worker RSS (read from /proc, so Linux only), both
+        for the worker alone and including its render-pool processes.
+        Throughput and latency count successful responses only; failed
+        requests are reported separately, so a configuration cannot rank well
+        by failing fast.
+
+Note: document_storage lives in each worker's memory, so with more than one
+worker a session's /ask and /download_summary can reach a worker that never
+saw its upload; those requests show up as errors in the report.
+"""
+import argparse
+import http.cookiejar
+import io
+import json
+import os
+import random
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ------------------------------
+# Mock Gemini server
+# ------------------------------
+MOCK_SUMMARY = {
+    "summary_elevator": "This is a residential lease between a landlord and a tenant for a fixed term.",
+    "summary_bullets": [
+        "Rent is due on the first day of each month.",
+        "Either party may terminate with 30 days written notice.",
+        "The tenant indemnifies the landlord against claims.",
+        "A security deposit of one month's rent is required.",
+        "The lease renews monthly after the initial term.",
+    ],
+    "missing_info": ["The exact start date", "Who pays for utilities"],
+    "confidence": 85,
+    "next_steps": ["Confirm the start date", "Ask about utilities", "Keep a signed copy"],
+}
+
+def make_mock_handler(latency_ms, jitter_ms, ms_per_1k_tokens):
+    class MockGeminiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not re.search(r"/models/[^/:]+:generateContent$", self.path.split("?")[0]):
+                self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+                return
+
+            prompt = "".join(
+                part.get("text", "")
+                for content in body.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            prompt_tokens = len(prompt) // 4
+            delay = latency_ms + random.uniform(-jitter_ms, jitter_ms) + ms_per_1k_tokens * prompt_tokens / 1000
+            time.sleep(max(0.0, delay) / 1000)
+
+            if "Return ONLY valid JSON" in prompt:
+                text = json.dumps(MOCK_SUMMARY)
+            else:
+                text = "Based on the document, either party may terminate with 30 days written notice."
+            self.send_json(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": len(text) // 4,
+                    "totalTokenCount": prompt_tokens + len(text) // 4,
+                },
+            })
+
+        def send_json(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return MockGeminiHandler
+
+def start_mock_server(port, latency_ms, jitter_ms, ms_per_1k_tokens):
+    server = ThreadingHTTPServer(("127.0.0.1", port),
+                                 make_mock_handler(latency_ms, jitter_ms, ms_per_1k_tokens))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# ------------------------------
+# Sample documents
+# ------------------------------
+CLAUSES = [
+    "The Tenant shall pay rent of ${amount} on the first day of each month.",
+    "Either party may terminate this Agreement with {days} days written notice.",
+    "The Tenant shall indemnify the Landlord against all claims arising from use of the premises.",
+    "A security deposit of ${amount} is payable on signing.",
+    "This Agreement renews automatically for successive {months}-month terms.",
+    "The Landlord is responsible for structural repairs; the Tenant for routine maintenance.",
+    "No alterations may be made to the premises without prior written consent.",
+    "This Agreement is governed by the laws of the State of {state}.",
+]
+
+def make_sample_pdf(seed, pages):
+    """Build a lease-like PDF; the seed varies names and amounts so cache hits are controlled."""
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        c.drawString(40, 760, "RESIDENTIAL LEASE AGREEMENT - CONFIDENTIAL")
+        y = 730
+        for line in range(36):
+            clause = rng.choice(CLAUSES).format(
+                amount=rng.randint(500, 5000), days=rng.choice([30, 60, 90]),
+                months=rng.choice([6, 12]), state=rng.choice(["Ohio", "Texas", "Oregon"]))
+            c.drawString(40, y, f"{page + 1}.{line + 1} {clause}"[:110])
+            y -= 18
+        c.drawString(280, 30, f"Page {page + 1} of {pages}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+# ------------------------------
+# Load generator
+# ------------------------------
+QUESTIONS = [
+    "What is the rent?",
+    "How can this agreement be terminated?",
+    "Explain the risks of the indemnity clause for me.",
+    "Does this agreement renew automatically?",
+    "Who pays for repairs?",
+]
+
+def multipart_body(field, filename, data, content_type="application/pdf"):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8") + data + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class VirtualUser:
+    """One browser-like client with its own cookie jar."""
+
+    def __init__(self, base_url, documents, mix, results, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.documents = documents
+        self.mix = mix
+        self.results = results
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.has_document = False
+
+    def request(self, endpoint, path, data=None, headers=None, method=None):
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers or {}, method=method)
+        start = time.perf_counter()
+        ok = False
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                response.read()
+                ok = 200 <= response.status < 300
+        except urllib.error.HTTPError as e:
+            e.read()
+        except (urllib.error.URLError, OSError):
+            pass
+        self.results.record(endpoint, (time.perf_counter() - start) * 1000, ok)
+        return ok
+
+    def step(self):
+        action = "upload" if not self.has_document else random.choices(
+            list(self.mix), weights=list(self.mix.values()))[0]
+        if action == "upload":
+            name, data = random.choice(self.documents)
+            body, content_type = multipart_body("file", name, data)
+            if self.request("upload", "/upload", body, {"Content-Type": content_type}):
+                self.has_document = True
+        elif action == "ask":
+            body = json.dumps({"question": random.choice(QUESTIONS)}).encode("utf-8")
+            self.request("ask", "/ask", body, {"Content-Type": "application/json"})
+        else:
+            self.request("download_summary", "/download_summary")
+
+class Results:
+    """Latencies of successful requests and counts of failed ones, per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, latency_ms, ok):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(latency_ms)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        report = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(endpoint, []))
+            errors = self.errors.get(endpoint, 0)
+            report[endpoint] = {
+                "requests": len(values) + errors,
+                "ok": len(values),
+                "errors": errors,
+                "rps": round(len(values) / elapsed, 2),
+                "error_rate": round(errors / (len(values) + errors), 3),
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "mean_ms": round(statistics.fmean(values), 1) if values else 0.0,
+            }
+        ok = sum(len(v) for v in self.latencies.values())
+        errors = sum(self.errors.values())
+        report["total"] = {
+            "requests": ok + errors,
+            "ok": ok,
+            "errors": errors,
+            "rps": round(ok / elapsed, 2),
+            "error_rate": round(errors / (ok + errors), 3) if ok + errors else 0.0,
+        }
+        return report
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("upload", "ask", "download_summary"):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def build_documents(count, pages):
+    return [(f"lease-{seed}.pdf", make_sample_pdf(seed, pages)) for seed in range(count)]
+
+def run_load(base_url, users, duration, mix, documents, timeout=120, warmup=0.0):
+    """Run the load for duration seconds and return the per-endpoint report."""
+    results = Results()
+    stop_at = time.monotonic() + warmup + duration
+    record_from = time.monotonic() + warmup
+
+    def user_loop():
+        user = VirtualUser(base_url, documents, mix, Results(), timeout)
+        while time.monotonic() < stop_at:
+            # Requests during warm-up are sent but not counted
+            user.results = results if time.monotonic() >= record_from else Results()
+            user.step()
+
+    threads = [threading.Thread(target=user_loop, daemon=True) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.summary(duration)
+
+# ------------------------------
+# gunicorn sweep
+# ------------------------------
+def process_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def child_pids(parent_pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, so split after its closing paren
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == parent_pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+def process_tree_rss_kb(pid):
+    """RSS of a process plus all its descendants, e.g. a gunicorn worker together
+    with its forkserver and render-pool processes."""
+    total = process_rss_kb(pid) or 0
+    for child in child_pids(pid):
+        total += process_tree_rss_kb(child)
+    return total
+
+def wait_for_http(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.25)
+    return False
+
+def run_sweep(args):
+    mock = start_mock_server(args.mock_port, args.latency_ms, args.jitter_ms, args.ms_per_1k_tokens)
+    documents = build_documents(args.documents, args.pages)
+    rows = []
+    try:
+        for worker_class in args.worker_classes.split(","):
+            for workers in [int(w) for w in args.workers.split(",")]:
+                rows.append(run_configuration(args, worker_class, workers, documents))
+    finally:
+        mock.shutdown()
+
+    print()
+    # rps and latencies are over successful responses only
+    print(f"{'class':<10}{'workers':>8}{'ok rps':>9}{'errors':>8}{'err %':>8}"
+          f"{'ask p50':>10}{'ask p95':>10}{'ask p99':>10}{'rss/worker MB':>15}{'worker+pool MB':>16}")
+    for row in rows:
+        total = row['report']['total']
+        ask = row['report'].get("ask", {})
+        rss = row['rss_mb_per_worker']
+        tree_rss = row['tree_rss_mb_per_worker']
+        print(f"{row['worker_class']:<10}{row['workers']:>8}{total['rps']:>9}"
+              f"{total['errors']:>8}{total['error_rate'] * 100:>8.1f}"
+              f"{ask.get('p50_ms', 0):>10}{ask.get('p95_ms', 0):>10}"
+              f"{ask.get('p99_ms', 0):>10}{(max(rss) if rss else 0):>15}"
+              f"{(max(tree_rss) if tree_rss else 0):>16}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nFull results written to {args.output}")
+
+def run_configuration(args, worker_class, workers, documents):
+    print(f"== {worker_class} x {workers}", flush=True)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{args.mock_port}",
+        "EXTRACTION_CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "CHUNKED_UPLOAD_DIR": os.path.join(workdir, "chunked"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "PYTHONPATH": APP_DIR,
+    })
+    for pair in args.app_env:
+        key, _, value = pair.partition("=")
+        env[key] = value
+
+    command = [
+        sys.executable, "-m", "gunicorn", "WebApp4G:app",
+        "--bind", f"127.0.0.1:{args.app_port}",
+        "--worker-class", worker_class,
+        "--workers", str(workers),
+        "--timeout", "300",
+        "--chdir", workdir,
+    ]
+    if worker_class == "gthread":
+        command += ["--threads", str(args.threads)]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        if not wait_for_http(base_url + "/", 60):
+            raise RuntimeError(f"gunicorn did not start for {worker_class} x {workers}")
+        report = run_load(base_url, args.users, args.duration, args.mix, documents,
+                          warmup=args.warmup)
+        worker_pids = child_pids(server.pid)
+        rss = [process_rss_kb(pid) for pid in worker_pids]
+        rss_mb = [round(kb / 1024, 1) for kb in rss if kb]
+        # Render pools run as grandchildren of each worker (via its forkserver)
+        tree_rss_mb = [round(process_tree_rss_kb(pid) / 1024, 1) for pid in worker_pids]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    print(json.dumps(report, indent=2), flush=True)
+    return {"worker_class": worker_class, "workers": workers, "report": report,
+            "rss_mb_per_worker": rss_mb, "tree_rss_mb_per_worker": tree_rss_mb}
+
+# ------------------------------
+# Command line
+# ------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_mock_options(p):
+        p.add_argument("--latency-ms", type=float, default=800, help="base model latency")
+        p.add_argument("--jitter-ms", type=float, default=200, help="uniform +/- jitter")
+        p.add_argument("--ms-per-1k-tokens", type=float, default=20, help="extra latency per 1k prompt tokens")
+
+    def add_load_options(p):
+        p.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+        p.add_argument("--duration", type=float, default=30, help="measured seconds per run")
+        p.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before each run")
+        p.add_argument("--mix", type=parse_mix, default=parse_mix("upload=1,ask=4,download_summary=1"),
+                       help="endpoint weights, e.g. upload=1,ask=4,download_summary=1")
+        p.add_argument("--documents", type=int, default=10, help="distinct sample PDFs")
+        p.add_argument("--pages", type=int, default=8, help="pages per sample PDF")
+
+    mock = commands.add_parser("mock", help="run the mock Gemini server")
+    mock.add_argument("--port", type=int, default=8765)
+    add_mock_options(mock)
+
+    run = commands.add_parser("run", help="load an already running app")
+    run.add_argument("--url", default="http://127.0.0.1:8000")
+    add_load_options(run)
+
+    sweep = commands.add_parser("sweep", help="sweep gunicorn configurations against the mock")
+    sweep.add_argument("--worker-classes", default="sync,gthread")
+    sweep.add_argument("--workers", default="1,2,4")
+    sweep.add_argument("--threads", type=int, default=4, help="threads per gthread worker")
+    sweep.add_argument("--app-port", type=int, default=8000)
+    sweep.add_argument("--mock-port", type=int, default=8765)
+    sweep.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                       help="extra environment for the app, e.g. SPECULATIVE_ENABLED=1")
+    sweep.add_argument("--output", help="write the full results as JSON")
+    add_mock_options(sweep)
+    add_load_options(sweep)
+
+    args = parser.parse_args()
+    if args.command == "mock":
+        start_mock_server(args.port, args.latency_ms, args.jitter_ms, args.ms_per_1k_tokens)
+        print(f"Mock Gemini listening on http://127.0.0.1:{args.port}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "run":
+        documents = build_documents(args.documents, args.pages)
+        report = run_load(args.url, args.users, args.duration, args.mix, documents, warmup=args.warmup)
+        print(json.dumps(report, indent=2))
+    else:
+        run_sweep(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Regression checks for revision detection by page hash."""
+import io
+import json
+
+import pytest
+from reportlab.pdfgen import canvas
+
+import WebApp4G
+
+SUMMARY = {"summary_elevator": "x", "summary_bullets": [], "missing_info": [], "confidence": 80, "next_steps": []}
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def generate_content(self, contents, **kwargs):
+        self.calls.append(contents)
+        return FakeResponse(json.dumps(SUMMARY))
+
+
+def form_pdf(lines):
+    """One page whose only content stream is "/Fm0 Do"; the text lives in the form XObject."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    pdf.beginForm("body")
+    y = 780
+    for line in lines:
+        pdf.drawString(40, y, line)
+        y -= 18
+    pdf.endForm()
+    pdf.doForm("body")
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+LEASE = form_pdf([f"The tenant shall pay rent of alpha {n} on the first day of each month." for n in range(20)])
+EMPLOYMENT = form_pdf([f"The employee shall report to the omega board {n} and keep its records." for n in range(20)])
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(WebApp4G.app.config, "EXTRACTION_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(WebApp4G, "_cache_schema_ready", False)
+    calls = []
+    monkeypatch.setattr(WebApp4G, "get_model", lambda tier: FakeModel(calls))
+    client = WebApp4G.app.test_client()
+    client.model_calls = calls
+    return client
+
+
+def upload(client, data, filename):
+    return client.post("/upload", data={"file": (io.BytesIO(data), filename)}, content_type="multipart/form-data")
+
+
+def test_form_xobject_pages_with_same_content_stream_hash_differently(tmp_path):
+    lease, employment = tmp_path / "lease.pdf", tmp_path / "employment.pdf"
+    lease.write_bytes(LEASE)
+    employment.write_bytes(EMPLOYMENT)
+    assert WebApp4G.hash_pdf_pages(str(lease)) != WebApp4G.hash_pdf_pages(str(employment))
+
+
+def test_different_form_xobject_document_is_not_a_revision(client):
+    assert upload(client, LEASE, "lease.pdf").status_code == 200
+    response = upload(client, EMPLOYMENT, "employment.pdf")
+    assert response.status_code == 200
+    assert "revision" not in response.get_json()
+    assert len(client.model_calls) == 2
+    results = client.get("/search", query_string={"q": "omega"}).get_json()["results"]
+    assert results and all(result["source"] == "employment.pdf" for result in results)
+
+
+def test_repeated_page_hashes_are_not_reused():
+    base_entry = {"page_hashes": ["a", "b", "b"], "pages": ["A", "B1", "B2"]}
+    assert WebApp4G.reusable_pages(["a", "b", "c"], base_entry) == {0: "A"}
+    assert WebApp4G.reusable_pages(["a", "a", "c"], base_entry) == {}
+
+
+def lease_pdf(tenant):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for page in range(4):
+        y = 780
+        for n in range(20):
+            line = f"Clause {page}.{n}: the tenant covenants item {page * 100 + n} regarding the premises."
+            if page == 1 and n == 3:
+                line = f"The tenant is {tenant}."
+            pdf.drawString(40, y, line)
+            y -= 18
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def test_revision_of_another_sessions_upload_does_not_report_changes(client):
+    assert upload(client, lease_pdf("Alice"), "alice.pdf").status_code == 200
+    other = WebApp4G.app.test_client()
+    result = upload(other, lease_pdf("Bob"), "bob.pdf").get_json()
+    assert "revision" not in result and "changes" not in result
+
+    own = upload(client, lease_pdf("Carol"), "carol.pdf").get_json()
+    assert own["revision"]["changed_pages"] == [2]
+    assert "changes" in own